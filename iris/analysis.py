@@ -8,54 +8,250 @@ computed AFTER converting each instant to the target timezone, so fractional
 offsets and DST land minutes in the right local hour and weekday.
 
 Grids are 7x24 lists indexed [weekday][hour], weekday 0 = Monday.
+
+Rollup buckets are (bucket_start_utc, messages, voice_seconds) rows for
+15-minute UTC buckets. Every zone offset in use is a multiple of 15 minutes
+(Kolkata's +5:30 and Kathmandu's +5:45 included), so each bucket lies inside
+one local hour and grids built from buckets match the raw-row functions.
 """
 from __future__ import annotations
 
+from bisect import bisect_left, bisect_right
+from collections import Counter
 from datetime import date, datetime, timezone, tzinfo
-from typing import Iterable, Iterator, Sequence
+from functools import cache
+from typing import Iterable, Iterator, NamedTuple, Sequence
 
 WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
 Grid = list[list[float]]
 
 
+# Below this many rows the NumPy engine's setup costs more than it saves.
+VECTOR_MIN_ROWS = 2_000
+
+# How far apart _offset_segments probes a zone. Real zones never change
+# offset twice within a day, so a day-step can't skip a transition.
+_PROBE_STEP = 86_400
+
+# date(1970, 1, 1).toordinal(); epoch day N is date.fromordinal(N + this).
+_EPOCH_ORDINAL = 719_163
+
+# Epoch day 0 was a Thursday, so local hour-since-epoch h falls in grid cell
+# (weekday * 24 + hour) == (h + 72) % 168.
+_CELL_SHIFT = 72 * 3600
+
+
 def _empty_grid() -> Grid:
     return [[0.0] * 24 for _ in range(7)]
 
 
-def message_grid(ts_list: Iterable[int], tz: tzinfo) -> Grid:
-    """Message counts per [weekday][hour], local to `tz`."""
-    grid = _empty_grid()
-    for ts in ts_list:
-        local = datetime.fromtimestamp(ts, tz)
-        grid[local.weekday()][local.hour] += 1
-    return grid
+@cache
+def _vector_engine():
+    """The NumPy engine (iris.fastgrid), or None when NumPy isn't installed."""
+    try:
+        from . import fastgrid
+    except ImportError:
+        return None
+    return fastgrid
+
+
+def _utc_offset(ts: int, tz: tzinfo) -> int:
+    return int(datetime.fromtimestamp(ts, tz).utcoffset().total_seconds())
+
+
+def _offset_segments(tz: tzinfo, lo: int, hi: int) -> list[tuple[int, int]]:
+    """Sorted (utc_start, offset_seconds) segments describing `tz` over
+    [lo, hi]. The first segment also covers everything before lo. Found by
+    probing once a day and bisecting to the exact second at each change."""
+    current = _utc_offset(lo, tz)
+    segments = [(lo, current)]
+    t = lo
+    while t < hi:
+        nxt = min(t + _PROBE_STEP, hi)
+        if _utc_offset(nxt, tz) == current:
+            t = nxt
+            continue
+        a, b = t, nxt  # offset(a) == current, offset(b) != current
+        while b - a > 1:
+            mid = (a + b) // 2
+            if _utc_offset(mid, tz) == current:
+                a = mid
+            else:
+                b = mid
+        current = _utc_offset(b, tz)
+        segments.append((b, current))
+        t = b
+    return segments
+
+
+class _Segments(NamedTuple):
+    lo: int
+    hi: int
+    starts: list[int]
+    offsets: list[int]
+
+
+class TzBucketer:
+    """Epoch seconds -> local wall-clock seconds for one zone, without a
+    datetime per instant. A zone's offset only changes a couple of times a
+    year, so the (utc_start, offset) segments for the range in play are
+    found once and each lookup is a bisect plus integer arithmetic.
+
+    The covered range grows on demand (with a year of slack either side).
+    Segments are swapped in as one tuple, so the shared instances are safe
+    to use from the worker threads charts render on.
+    """
 
+    _SLACK = 366 * 86_400
+
+    def __init__(self, tz: tzinfo):
+        self.tz = tz
+        self._segs: _Segments | None = None
+
+    def cover(self, lo: int, hi: int) -> _Segments:
+        """Make sure [lo, hi] is covered; returns the current segments."""
+        segs = self._segs
+        if segs is not None and segs.lo <= lo and hi <= segs.hi:
+            return segs
+        if segs is not None:
+            lo, hi = min(lo, segs.lo), max(hi, segs.hi)
+        lo, hi = lo - self._SLACK, hi + self._SLACK
+        found = _offset_segments(self.tz, lo, hi)
+        segs = _Segments(lo, hi, [s for s, _ in found], [o for _, o in found])
+        self._segs = segs
+        return segs
+
+    def local(self, ts: int) -> int:
+        """Local wall-clock time of `ts`, as seconds since the local epoch."""
+        segs = self._segs
+        if segs is None or not segs.lo <= ts <= segs.hi:
+            segs = self.cover(ts, ts)
+        return ts + segs.offsets[bisect_right(segs.starts, ts) - 1]
+
+    def segment(self, ts: int) -> tuple[int, int, int]:
+        """(utc_start, utc_end, offset) of the stretch containing `ts` during
+        which the offset is constant (as far as the covered range knows)."""
+        segs = self._segs
+        if segs is None or not segs.lo <= ts < segs.hi:
+            segs = self.cover(ts, ts)
+        i = bisect_right(segs.starts, ts) - 1
+        end = segs.starts[i + 1] if i + 1 < len(segs.starts) else segs.hi
+        return segs.starts[i], end, segs.offsets[i]
+
+    def cell(self, ts: int) -> tuple[int, int]:
+        """(weekday, hour) of `ts` in this zone, weekday 0 = Monday."""
+        return divmod((self.local(ts) + _CELL_SHIFT) // 3600 % 168, 24)
+
+    def runs(self, ts_sorted: Sequence[int]) -> Iterator[tuple[int, Sequence[int]]]:
+        """Split sorted instants into (offset, run) slices that share one UTC
+        offset, so callers can convert a whole run with plain addition."""
+        if not ts_sorted:
+            return
+        segs = self.cover(ts_sorted[0], ts_sorted[-1])
+        first = bisect_right(segs.starts, ts_sorted[0]) - 1
+        a = 0
+        for i in range(first, len(segs.starts)):
+            nxt = segs.starts[i + 1] if i + 1 < len(segs.starts) else None
+            b = len(ts_sorted) if nxt is None else bisect_left(ts_sorted, nxt, a)
+            if b > a:
+                yield segs.offsets[i], ts_sorted[a:b]
+            if b == len(ts_sorted):
+                return
+            a = b
+
+    def date(self, ts: int) -> date:
+        return date.fromordinal(self.local(ts) // 86_400 + _EPOCH_ORDINAL)
+
+
+_bucketers: dict[tzinfo, TzBucketer] = {}
+
+
+def bucketer(tz: tzinfo) -> TzBucketer:
+    """The shared TzBucketer for `tz`, so every chart drawn in one zone
+    reuses the same offset segments."""
+    b = _bucketers.get(tz)
+    if b is None:
+        b = _bucketers.setdefault(tz, TzBucketer(tz))
+    return b
 
-def _walk_session(start_utc: int, end_utc: int, tz: tzinfo) -> Iterator[tuple[datetime, float]]:
-    """Yield (local_segment_start, minutes) for each local-hour segment a
-    session spans, e.g. 14:30-16:15 -> (14:30, 30), (15:00, 60), (16:00, 15).
 
-    Walks in epoch seconds and reconverts at each hour boundary, so DST
-    transitions and fractional offsets can't misassign minutes.
-    """
-    epoch = start_utc
-    end = max(end_utc, start_utc)
-    while epoch < end:
-        local = datetime.fromtimestamp(epoch, tz)
-        to_boundary = 3600 - (local.minute * 60 + local.second)
-        seg_end = min(epoch + max(to_boundary, 1), end)
-        yield local, (seg_end - epoch) / 60.0
-        epoch = seg_end
+def message_grid(ts_list: Iterable[int], tz: tzinfo) -> Grid:
+    """Message counts per [weekday][hour], local to `tz`."""
+    engine = _vector_engine()
+    if engine is not None:
+        ts_list = ts_list if isinstance(ts_list, Sequence) else list(ts_list)
+        if len(ts_list) >= VECTOR_MIN_ROWS:
+            return engine.message_grid(ts_list, tz)
+    counts = [0] * 168
+    for offset, run in bucketer(tz).runs(sorted(ts_list)):
+        shift = offset + _CELL_SHIFT
+        for cell, n in Counter([(ts + shift) // 3600 % 168 for ts in run]).items():
+            counts[cell] += n
+    return [[float(n) for n in counts[d * 24:(d + 1) * 24]] for d in range(7)]
 
 
 def voice_grid(sessions: Iterable[tuple[int, int]], tz: tzinfo) -> Grid:
     """Voice minutes per [weekday][hour], local to `tz`."""
-    grid = _empty_grid()
+    engine = _vector_engine()
+    if engine is not None:
+        sessions = sessions if isinstance(sessions, Sequence) else list(sessions)
+        if len(sessions) >= VECTOR_MIN_ROWS:
+            return engine.voice_grid(sessions, tz)
+    # Walk each session in epoch seconds, cutting at every local hour
+    # boundary (14:30-16:15 -> 30, 60, 15 minutes) and re-reading the offset
+    # as we go, so DST and fractional offsets can't misassign minutes.
+    segment = bucketer(tz).segment
+    cells = [0.0] * 168
+    lo = hi = shift = 0
+    for start, end in sessions:
+        epoch = start
+        while epoch < end:
+            if not lo <= epoch < hi:
+                lo, hi, offset = segment(epoch)
+                shift = offset + _CELL_SHIFT
+            local = epoch + shift
+            seg_end = min(epoch + 3600 - local % 3600, end)
+            cells[local // 3600 % 168] += (seg_end - epoch) / 60.0
+            epoch = seg_end
+    return [cells[d * 24:(d + 1) * 24] for d in range(7)]
+
+
+BUCKET_SECONDS = 900
+
+Bucket = tuple[int, int, int]  # (bucket_start_utc, messages, voice_seconds)
+
+
+def voice_buckets(start_utc: int, end_utc: int) -> Iterator[tuple[int, int]]:
+    """Yield (bucket_start_utc, seconds) for each 15-minute UTC bucket a
+    session overlaps. Negative-length sessions yield nothing."""
+    b = start_utc - start_utc % BUCKET_SECONDS
+    while b < end_utc:
+        seconds = min(end_utc, b + BUCKET_SECONDS) - max(start_utc, b)
+        if seconds > 0:
+            yield b, seconds
+        b += BUCKET_SECONDS
+
+
+def to_buckets(
+    ts_list: Iterable[int], sessions: Iterable[tuple[int, int]]
+) -> list[Bucket]:
+    """Roll raw messages and closed sessions up into sorted buckets — the
+    same shape Storage.get_activity_buckets returns."""
+    counts: dict[int, list[int]] = {}
+    for ts in ts_list:
+        counts.setdefault(ts - ts % BUCKET_SECONDS, [0, 0])[0] += 1
     for start, end in sessions:
-        for local, minutes in _walk_session(start, end, tz):
-            grid[local.weekday()][local.hour] += minutes
-    return grid
+        for b, seconds in voice_buckets(start, end):
+            counts.setdefault(b, [0, 0])[1] += seconds
+    return [(b, m, v) for b, (m, v) in sorted(counts.items())]
+
+
+def bucket_grids(buckets: Iterable[Bucket], tz: tzinfo) -> tuple[Grid, Grid]:
+    """(message grid, voice-minutes grid) from rollup buckets, local to `tz`."""
+    agg = Activity(tz)
+    agg.add_buckets(buckets)
+    return agg.grids()
 
 
 def hour_totals(grid: Grid) -> list[float]:
@@ -74,13 +270,10 @@ def active_dates(
     ts_list: Iterable[int], sessions: Iterable[tuple[int, int]], tz: tzinfo
 ) -> set[date]:
     """Distinct local dates with any activity (a message or any VC minute)."""
-    dates: set[date] = set()
-    for ts in ts_list:
-        dates.add(datetime.fromtimestamp(ts, tz).date())
-    for start, end in sessions:
-        for local, _ in _walk_session(start, end, tz):
-            dates.add(local.date())
-    return dates
+    agg = Activity(tz)
+    agg.add_messages(ts_list)
+    agg.add_sessions(sessions)
+    return agg.dates()
 
 
 def game_totals(
@@ -111,39 +304,166 @@ def _argmax_combined_share(a: Sequence[float], b: Sequence[float]) -> int | None
     return max(range(len(shares)), key=shares.__getitem__)
 
 
+class Activity:
+    """One streaming pass over a member's history that yields everything the
+    charts and the stat card need: both grids, the active-date set, session
+    stats, and first/last activity. Feed it raw messages and sessions, or
+    rollup buckets plus sessions; nothing is copied or walked twice.
+
+        agg = Activity(tz)
+        agg.add_messages(ts_list)
+        agg.add_sessions(sessions)
+        agg.summary()
+    """
+
+    def __init__(self, tz: tzinfo):
+        self._bucketer = bucketer(tz)
+        self._segment = self._bucketer.segment
+        self._msg_cells = [0] * 168
+        self._vc_cells = [0.0] * 168     # minutes, from raw sessions
+        self._vc_seconds = [0] * 168     # seconds, from rollup buckets
+        self._days: set[int] = set()     # local days since the epoch
+        self.total_messages = 0
+        self.session_count = 0
+        self.total_vc_seconds = 0
+        self.longest_session_seconds = 0
+        self.first_utc: int | None = None
+        self.last_utc: int | None = None
+
+    def _see(self, start: int, end: int) -> None:
+        if self.first_utc is None or start < self.first_utc:
+            self.first_utc = start
+        if self.last_utc is None or end > self.last_utc:
+            self.last_utc = end
+
+    def add_messages(self, ts_list: Iterable[int]) -> None:
+        segment, cells, days = self._segment, self._msg_cells, self._days
+        lo = hi = offset = 0
+        count = 0
+        first = last = None
+        for ts in ts_list:
+            if not lo <= ts < hi:
+                lo, hi, offset = segment(ts)
+            local = ts + offset
+            cells[(local + _CELL_SHIFT) // 3600 % 168] += 1
+            days.add(local // 86_400)
+            if first is None or ts < first:
+                first = ts
+            if last is None or ts > last:
+                last = ts
+            count += 1
+        self.total_messages += count
+        if count:
+            self._see(first, last)
+
+    def add_sessions(
+        self, sessions: Iterable[tuple[int, int]], bucketed: bool = False
+    ) -> None:
+        """Closed (start_utc, end_utc) sessions. With bucketed=True their
+        minutes already arrived through add_buckets, so only the session
+        stats and first/last activity are taken from them."""
+        segment, cells, days = self._segment, self._vc_cells, self._days
+        lo = hi = offset = 0
+        for start, end in sessions:
+            length = max(end - start, 0)
+            self.session_count += 1
+            self.total_vc_seconds += length
+            self.longest_session_seconds = max(self.longest_session_seconds, length)
+            self._see(start, end)
+            if bucketed:
+                continue
+            epoch = start  # same hour-boundary walk as voice_grid
+            while epoch < end:
+                if not lo <= epoch < hi:
+                    lo, hi, offset = segment(epoch)
+                local = epoch + offset
+                seg_end = min(epoch + 3600 - local % 3600, end)
+                cells[(local + _CELL_SHIFT) // 3600 % 168] += (seg_end - epoch) / 60.0
+                days.add(local // 86_400)
+                epoch = seg_end
+
+    def add_buckets(self, buckets: Iterable[Bucket]) -> None:
+        """Rollup rows. A bucket only knows its quarter hour, so it counts
+        toward first activity but not last (see add_last)."""
+        segment = self._segment
+        msg_cells, vc_seconds, days = self._msg_cells, self._vc_seconds, self._days
+        lo = hi = offset = 0
+        for start, messages, seconds in buckets:
+            if not lo <= start < hi:
+                lo, hi, offset = segment(start)
+            local = start + offset
+            cell = (local + _CELL_SHIFT) // 3600 % 168
+            msg_cells[cell] += messages
+            vc_seconds[cell] += seconds
+            days.add(local // 86_400)
+            self.total_messages += messages
+            if self.first_utc is None or start < self.first_utc:
+                self.first_utc = start
+
+    def add_last(self, ts: int | None) -> None:
+        """Record an exact activity time, e.g. the newest message."""
+        if ts is not None:
+            self._see(ts, ts)
+
+    def grids(self) -> tuple[Grid, Grid]:
+        msg = [float(n) for n in self._msg_cells]
+        vc = [
+            minutes + seconds / 60.0 if seconds else minutes
+            for minutes, seconds in zip(self._vc_cells, self._vc_seconds)
+        ]
+        return ([msg[d * 24:(d + 1) * 24] for d in range(7)],
+                [vc[d * 24:(d + 1) * 24] for d in range(7)])
+
+    def dates(self) -> set[date]:
+        return {date.fromordinal(day + _EPOCH_ORDINAL) for day in self._days}
+
+    def summary(self) -> dict:
+        """Everything the /stats card shows, as plain numbers (no formatting)."""
+        msg_g, vc_g = self.grids()
+        total_messages, total_vc = self.total_messages, self.total_vc_seconds
+        return {
+            "total_messages": total_messages,
+            "total_vc_seconds": total_vc,
+            "session_count": self.session_count,
+            "longest_session_seconds": self.longest_session_seconds,
+            "avg_session_seconds": total_vc / self.session_count if self.session_count else 0,
+            "vc_seconds_per_message": total_vc / total_messages if total_messages else None,
+            "most_active_hour": _argmax_combined_share(hour_totals(msg_g), hour_totals(vc_g)),
+            "most_active_weekday": _argmax_combined_share(
+                weekday_totals(msg_g), weekday_totals(vc_g)
+            ),
+            "tracked_since": (
+                self._bucketer.date(self.first_utc) if self.first_utc is not None else None
+            ),
+            "last_active_utc": self.last_utc,
+            "active_days": len(self._days),
+        }
+
+
 def summary(
-    ts_list: Sequence[int], sessions: Sequence[tuple[int, int]], tz: tzinfo
+    ts_list: Iterable[int], sessions: Iterable[tuple[int, int]], tz: tzinfo
 ) -> dict:
     """Everything the /stats card shows, as plain numbers (no formatting)."""
-    msg_g = message_grid(ts_list, tz)
-    vc_g = voice_grid(sessions, tz)
-
-    durations = [max(end - start, 0) for start, end in sessions]
-    total_vc_seconds = sum(durations)
-    total_messages = len(ts_list)
-
-    event_starts = list(ts_list) + [s for s, _ in sessions]
-    event_ends = list(ts_list) + [e for _, e in sessions]
-
-    return {
-        "total_messages": total_messages,
-        "total_vc_seconds": total_vc_seconds,
-        "session_count": len(sessions),
-        "longest_session_seconds": max(durations, default=0),
-        "avg_session_seconds": (total_vc_seconds / len(durations)) if durations else 0,
-        "vc_seconds_per_message": (
-            total_vc_seconds / total_messages if total_messages else None
-        ),
-        "most_active_hour": _argmax_combined_share(hour_totals(msg_g), hour_totals(vc_g)),
-        "most_active_weekday": _argmax_combined_share(
-            weekday_totals(msg_g), weekday_totals(vc_g)
-        ),
-        "tracked_since": (
-            datetime.fromtimestamp(min(event_starts), tz).date() if event_starts else None
-        ),
-        "last_active_utc": max(event_ends, default=None),
-        "active_days": len(active_dates(ts_list, sessions, tz)),
-    }
+    agg = Activity(tz)
+    agg.add_messages(ts_list)
+    agg.add_sessions(sessions)
+    return agg.summary()
+
+
+def bucket_summary(
+    buckets: Iterable[Bucket],
+    sessions: Iterable[tuple[int, int]],
+    last_message_utc: int | None,
+    tz: tzinfo,
+) -> dict:
+    """summary() computed from rollup buckets instead of every raw message.
+    Sessions are still needed for the duration stats, and the newest message
+    time for "last active" (a bucket only knows its quarter hour)."""
+    agg = Activity(tz)
+    agg.add_buckets(buckets)
+    agg.add_sessions(sessions, bucketed=True)
+    agg.add_last(last_message_utc)
+    return agg.summary()
 
 
 VoiceEvent = tuple[int, int, int, str]  # (ts_utc, user_id, channel_id, 'join'|'leave')
@@ -43,7 +43,13 @@ UTC_NOTE = (
     "3. Pick yours from the list — it's saved, all future charts use it."
 )
 
-storage = Storage(config.DB_PATH)
+storage = Storage(
+    config.DB_PATH,
+    readers=config.DB_READERS,
+    ingest_max=config.INGEST_QUEUE_MAX,
+    ingest_batch=config.INGEST_BATCH_SIZE,
+    ingest_interval=config.INGEST_FLUSH_SECONDS,
+)
 
 
 class IrisClient(discord.Client):
@@ -67,11 +73,18 @@ class IrisClient(discord.Client):
         # is only there so shields survive a restart.
         self.unmute_shields: dict[tuple[int, int], int] = {}
         self._unmute_undos: dict[tuple[int, int], int] = {}
+        # Open sessions and their row ids: (guild_id, user_id) -> voice row,
+        # (guild_id, user_id, game) -> game row. Kept in step by the events
+        # below so the heartbeat touches only what's live instead of walking
+        # every member of every guild each minute.
+        self.live_voice: dict[tuple[int, int], int] = {}
+        self.live_games: dict[tuple[int, int, str], int] = {}
 
     async def setup_hook(self) -> None:
         await storage.open()
         self.opted_out = await storage.get_opted_out_ids()
         now = int(time.time())
+        await storage.start_run(now)
         await storage.purge_expired_unmute_shields(now)
         self.unmute_shields = {
             (guild_id, user_id): expires
@@ -105,7 +118,7 @@ class IrisClient(discord.Client):
         # carry a member author but aren't messages they sent.
         if message.type not in (discord.MessageType.default, discord.MessageType.reply):
             return
-        await storage.log_message(
+        await storage.queue_message(
             message.author.id,
             message.guild.id,
             message.channel.id,
@@ -130,9 +143,9 @@ class IrisClient(discord.Client):
             return  # mute/deafen/video/stream change, not a join/leave/move
         now = int(time.time())
         if before.channel is not None:
-            await storage.close_voice_session(member.id, member.guild.id, now)
+            await self.close_voice(member.id, member.guild.id, now)
         if after.channel is not None:
-            await storage.open_voice_session(member.id, member.guild.id, after.channel.id, now)
+            await self.open_voice(member.id, member.guild.id, after.channel.id, now)
 
     async def on_presence_update(
         self, before: discord.Member, after: discord.Member
@@ -147,9 +160,9 @@ class IrisClient(discord.Client):
             return
         now = int(time.time())
         for game in before_games - after_games:
-            await storage.close_game_session(after.id, after.guild.id, game, now)
+            await self.close_game(after.id, after.guild.id, game, now)
         for game in after_games - before_games:
-            await storage.open_game_session(after.id, after.guild.id, game, now)
+            await self.open_game(after.id, after.guild.id, game, now)
 
     # -- crash recovery -------------------------------------------------------
 
@@ -161,25 +174,26 @@ class IrisClient(discord.Client):
         now = int(time.time())
         stale = await storage.reconcile_open_sessions(now)
         stale_games = await storage.reconcile_open_game_sessions(now)
+        self.live_voice.clear()
+        self.live_games.clear()
         if stale or stale_games:
             log.info(
                 "Reconciled %d voice and %d game session(s) left open by a previous run",
                 stale, stale_games,
             )
-        opened = played = 0
+        voice_rows: list[tuple[int, int, int]] = []
+        game_rows: list[tuple[int, int, str]] = []
         for guild in self.guilds:
             for channel in (*guild.voice_channels, *guild.stage_channels):
                 for member in channel.members:
                     if member.bot or member.id in self.opted_out:
                         continue
-                    await storage.open_voice_session(member.id, guild.id, channel.id, now)
-                    opened += 1
+                    voice_rows.append((member.id, guild.id, channel.id))
             for member in guild.members:
                 if member.bot or member.id in self.opted_out:
                     continue
-                for game in _playing_games(member):
-                    await storage.open_game_session(member.id, guild.id, game, now)
-                    played += 1
+                game_rows.extend((member.id, guild.id, game) for game in _playing_games(member))
+        opened, played = await self.open_snapshot(voice_rows, game_rows, now)
         if opened:
             log.info("Snapshotted %d member(s) already in voice", opened)
         if played:
@@ -190,24 +204,47 @@ class IrisClient(discord.Client):
         if not backup_loop.is_running():
             backup_loop.start()
 
-    def members_in_voice(self) -> list[int]:
-        return [
-            member.id
-            for guild in self.guilds
-            for channel in (*guild.voice_channels, *guild.stage_channels)
-            for member in channel.members
-            if not member.bot and member.id not in self.opted_out
-        ]
-
-    def members_playing(self) -> list[tuple[int, str]]:
-        """(user_id, game) for every game currently being played, filtered."""
-        return [
-            (member.id, game)
-            for guild in self.guilds
-            for member in guild.members
-            if not member.bot and member.id not in self.opted_out
-            for game in _playing_games(member)
-        ]
+    # -- live session registry ----------------------------------------------
+
+    async def open_voice(self, user_id: int, guild_id: int, channel_id: int, now: int) -> None:
+        self.live_voice[(guild_id, user_id)] = await storage.open_voice_session(
+            user_id, guild_id, channel_id, now
+        )
+
+    async def close_voice(self, user_id: int, guild_id: int, now: int) -> None:
+        self.live_voice.pop((guild_id, user_id), None)
+        await storage.close_voice_session(user_id, guild_id, now)
+
+    async def open_game(self, user_id: int, guild_id: int, game: str, now: int) -> None:
+        self.live_games[(guild_id, user_id, game)] = await storage.open_game_session(
+            user_id, guild_id, game, now
+        )
+
+    async def close_game(self, user_id: int, guild_id: int, game: str, now: int) -> None:
+        self.live_games.pop((guild_id, user_id, game), None)
+        await storage.close_game_session(user_id, guild_id, game, now)
+
+    async def open_snapshot(
+        self,
+        voice_rows: list[tuple[int, int, int]],
+        game_rows: list[tuple[int, int, str]],
+        now: int,
+    ) -> tuple[int, int]:
+        """Open many sessions at once — (user_id, guild_id, channel_id) and
+        (user_id, guild_id, game) rows — one transaction per table instead of
+        one per member. Returns (voice opened, games opened)."""
+        voice = await storage.open_voice_sessions_bulk(voice_rows, now)
+        games = await storage.open_game_sessions_bulk(game_rows, now)
+        self.live_voice.update(voice)
+        self.live_games.update(games)
+        return len(voice), len(games)
+
+    def forget_member(self, user_id: int) -> None:
+        """Drop every live session of a member (opt-out deletes the rows)."""
+        for key in [key for key in self.live_voice if key[1] == user_id]:
+            del self.live_voice[key]
+        for key in [key for key in self.live_games if key[1] == user_id]:
+            del self.live_games[key]
 
     # -- /unmute shields -------------------------------------------------------
 
@@ -282,8 +319,11 @@ client = IrisClient()
 @tasks.loop(seconds=config.HEARTBEAT_SECONDS)
 async def heartbeat_loop() -> None:
     now = int(time.time())
-    await storage.heartbeat(client.members_in_voice(), now)
-    await storage.heartbeat_games(client.members_playing(), now)
+    if config.RECOVERY_MODE == "sessions":
+        await storage.heartbeat_voice_rows(list(client.live_voice.values()), now)
+        await storage.heartbeat_game_rows(list(client.live_games.values()), now)
+    else:
+        await storage.mark_alive(now)
     await client.expire_unmute_shields(now)
 
 
@@ -424,10 +464,15 @@ async def _requester_tz(user_id: int) -> tuple[ZoneInfo, str, str | None]:
     return ZoneInfo("UTC"), "UTC", UTC_NOTE
 
 
-async def _fetch_activity(user_id: int, guild_id: int) -> tuple[list[int], list[tuple[int, int]]]:
-    msgs = [ts for _, ts in await storage.get_messages(user_id, guild_id)]
+async def _fetch_card_data(
+    user_id: int, guild_id: int
+) -> tuple[list[tuple[int, int, int]], list[tuple[int, int]], int | None]:
+    """(rollup buckets, closed voice sessions, newest message time) — all the
+    stat card needs, without pulling every message timestamp."""
+    buckets = await storage.get_activity_buckets(user_id, guild_id)
     sessions = [(s, e) for _, s, e in await storage.get_voice_sessions(user_id, guild_id)]
-    return msgs, sessions
+    last_message = await storage.last_message_utc(user_id, guild_id)
+    return buckets, sessions, last_message
 
 
 def _fmt_date(d: date | None) -> str:
@@ -447,10 +492,9 @@ def _fmt_last_active(epoch: int | None, tz: ZoneInfo) -> str:
     return _fmt_date(datetime.fromtimestamp(epoch, tz).date())
 
 
-def _build_activity_png(name, msgs, sessions, tz, tz_label, day_index):
-    """Sync: aggregation + render, run via asyncio.to_thread."""
-    msg_grid = analysis.message_grid(msgs, tz)
-    vc_grid = analysis.voice_grid(sessions, tz)
+def _build_activity_png(name, msg_grid, vc_grid, tz_label, day_index):
+    """Sync: render, run via asyncio.to_thread. The grids arrive already
+    bucketed (Storage.get_activity_grids does that inside SQLite)."""
     if day_index is None:
         return charts.render_activity(
             name, f"Activity · all time · times in {tz_label}",
@@ -472,9 +516,9 @@ def _build_games_png(name, game_sessions, subtitle, since):
     return charts.render_games(name, subtitle, analysis.game_totals(game_sessions))
 
 
-def _build_stats_png(name, msgs, sessions, tz, tz_label, joined: date | None):
+def _build_stats_png(name, buckets, sessions, last_message, tz, tz_label, joined: date | None):
     """Sync: aggregation + render, run via asyncio.to_thread."""
-    s = analysis.summary(msgs, sessions, tz)
+    s = analysis.bucket_summary(buckets, sessions, last_message, tz)
     per_msg = s["vc_seconds_per_message"]
     has_vc = s["session_count"] > 0
     hero = [
@@ -564,23 +608,21 @@ async def _send_chart(
         await interaction.followup.send(note, ephemeral=True)
 
 
-async def _target_data(
-    interaction: discord.Interaction, user: discord.Member
-) -> tuple[list[int], list[tuple[int, int]]] | None:
-    """Defer, validate the target, and fetch their rows. Returns None (with
-    the response already sent) when there's nothing to render."""
+async def _target_ok(interaction: discord.Interaction, user: discord.Member) -> bool:
+    """Defer and validate the target. Returns False (with the response
+    already sent) when they can't have any data."""
     await interaction.response.defer()
     if user.bot:
         await interaction.followup.send("Bots aren't tracked.")
-        return None
+        return False
     if await storage.is_opted_out(user.id):
         await interaction.followup.send("No data — this user has opted out.")
-        return None
-    msgs, sessions = await _fetch_activity(user.id, interaction.guild_id)
-    if not msgs and not sessions:
-        await interaction.followup.send(f"No activity recorded for **{user.display_name}** yet.")
-        return None
-    return msgs, sessions
+        return False
+    return True
+
+
+async def _no_activity(interaction: discord.Interaction, user: discord.Member) -> None:
+    await interaction.followup.send(f"No activity recorded for **{user.display_name}** yet.")
 
 
 @stats_group.command(name="activity", description="Activity charts for a member")
@@ -591,14 +633,16 @@ async def stats_activity(
     user: discord.Member,
     day: app_commands.Choice[int] | None = None,
 ) -> None:
-    data = await _target_data(interaction, user)
-    if data is None:
+    if not await _target_ok(interaction, user):
         return
-    msgs, sessions = data
     tz, tz_label, note = await _requester_tz(interaction.user.id)
+    msg_grid, vc_grid = await storage.get_activity_grids(user.id, interaction.guild_id, tz.key)
+    if not any(map(any, msg_grid)) and not any(map(any, vc_grid)):
+        await _no_activity(interaction, user)
+        return
     day_index = day.value if day is not None else None
     png = await asyncio.to_thread(
-        _build_activity_png, user.display_name, msgs, sessions, tz, tz_label, day_index
+        _build_activity_png, user.display_name, msg_grid, vc_grid, tz_label, day_index
     )
     await _send_chart(interaction, png, "activity.png", note)
 
@@ -606,14 +650,17 @@ async def stats_activity(
 @stats_group.command(name="card", description="Stats card for a member")
 @app_commands.describe(user="Member to view")
 async def stats_card(interaction: discord.Interaction, user: discord.Member) -> None:
-    data = await _target_data(interaction, user)
-    if data is None:
+    if not await _target_ok(interaction, user):
+        return
+    buckets, sessions, last_message = await _fetch_card_data(user.id, interaction.guild_id)
+    if not buckets and not sessions:
+        await _no_activity(interaction, user)
         return
-    msgs, sessions = data
     tz, tz_label, note = await _requester_tz(interaction.user.id)
     joined = user.joined_at.date() if user.joined_at else None
     png = await asyncio.to_thread(
-        _build_stats_png, user.display_name, msgs, sessions, tz, tz_label, joined
+        _build_stats_png, user.display_name, buckets, sessions, last_message,
+        tz, tz_label, joined,
     )
     await _send_chart(interaction, png, "stats.png", note)
 
@@ -673,6 +720,7 @@ privacy_group = app_commands.Group(
 async def privacy_optout(interaction: discord.Interaction) -> None:
     await storage.set_optout(interaction.user.id)
     client.opted_out.add(interaction.user.id)
+    client.forget_member(interaction.user.id)
     await interaction.response.send_message(
         "Opted out. Your recorded messages, voice sessions, and game activity "
         "have been deleted, and Iris will no longer log you.",
@@ -688,13 +736,11 @@ async def privacy_optin(interaction: discord.Interaction) -> None:
     # immediately rather than waiting for the next join/presence change.
     member = interaction.guild.get_member(interaction.user.id) if interaction.guild else None
     if member:
-        now = int(time.time())
+        voice_rows = []
         if member.voice and member.voice.channel:
-            await storage.open_voice_session(
-                member.id, interaction.guild_id, member.voice.channel.id, now
-            )
-        for game in _playing_games(member):
-            await storage.open_game_session(member.id, interaction.guild_id, game, now)
+            voice_rows.append((member.id, interaction.guild_id, member.voice.channel.id))
+        game_rows = [(member.id, interaction.guild_id, game) for game in _playing_games(member)]
+        await client.open_snapshot(voice_rows, game_rows, int(time.time()))
     await interaction.response.send_message(
         "Opted in — Iris will log your activity from now on. "
         "Previously deleted history is not restored.",
@@ -1484,6 +1530,9 @@ async def main() -> None:
             # "stops" now, so nothing is left open and reconcile has nothing to
             # guess at next boot.
             heartbeat_loop.cancel()
+            # Anything still in the write-behind queue goes to disk first.
+            await storage.flush_messages()
+            log.info("Message ingest: %s", storage.ingest_metrics())
             now = int(time.time())
             await storage.close_all_open_sessions(now)
             await storage.close_all_open_game_sessions(now)
@@ -29,6 +29,21 @@ GUILD_ID = int(os.environ["GUILD_ID"]) if os.environ.get("GUILD_ID") else None
 # longer an env var — it's set at runtime with /admin set and lives in the db.
 
 HEARTBEAT_SECONDS = 60
+# Crash recovery bookkeeping each heartbeat: "watermark" writes one row (this
+# run's last-alive time) and a crashed run's open sessions are closed at it;
+# "sessions" stamps every open voice/game session row instead.
+RECOVERY_MODE = "watermark"
+
+# Read-only SQLite connections kept open for /stats and other reads, so they
+# run in parallel with capture writes (WAL mode) instead of queueing behind them.
+DB_READERS = 2
+
+# Message capture is write-behind: messages queue in memory and are committed
+# in batches of up to INGEST_BATCH_SIZE, at least every INGEST_FLUSH_SECONDS.
+# A full queue (INGEST_QUEUE_MAX) makes on_message wait rather than drop.
+INGEST_QUEUE_MAX = 10_000
+INGEST_BATCH_SIZE = 500
+INGEST_FLUSH_SECONDS = 0.25
 
 # /unmute: how long one shield lasts, how long before a member can raise
 # another (admins skip this), and a circuit breaker so a mute war can't turn
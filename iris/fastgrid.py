@@ -0,0 +1,80 @@
+"""Optional NumPy engine behind analysis.message_grid / voice_grid.
+
+Same results as the pure-Python loops, bit for bit, but computed over int64
+arrays: instants are shifted to local time with a lookup into the zone's
+UTC-offset transitions, voice sessions are cut at local hour boundaries in
+bulk, and the 7x24 grid is filled with one bincount. analysis.py only calls
+in here for large inputs, and only when NumPy is installed.
+"""
+from __future__ import annotations
+
+from datetime import tzinfo
+from typing import Sequence
+
+import numpy as np
+
+from .analysis import Grid, _empty_grid, bucketer
+
+
+def _to_grid(cells: np.ndarray, weights: np.ndarray | None = None) -> Grid:
+    counts = np.bincount(cells, weights=weights, minlength=168)
+    return [[float(v) for v in counts[d * 24:(d + 1) * 24]] for d in range(7)]
+
+
+def _local(epochs: np.ndarray, starts: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Epoch seconds shifted into local wall-clock seconds."""
+    seg = np.searchsorted(starts, epochs, side="right") - 1
+    return epochs + offsets[np.maximum(seg, 0)]
+
+
+def _cells(local: np.ndarray) -> np.ndarray:
+    """Grid cell (weekday * 24 + hour) of each local instant. Day 0 of the
+    epoch was a Thursday, hence the +3."""
+    days = local // 86_400
+    return ((days + 3) % 7) * 24 + (local % 86_400) // 3600
+
+
+def _transitions(tz: tzinfo, lo: int, hi: int) -> tuple[np.ndarray, np.ndarray]:
+    segs = bucketer(tz).cover(lo, hi)
+    return np.array(segs.starts, dtype=np.int64), np.array(segs.offsets, dtype=np.int64)
+
+
+def message_grid(ts_list: Sequence[int], tz: tzinfo) -> Grid:
+    ts = np.asarray(ts_list, dtype=np.int64)
+    if ts.size == 0:
+        return _empty_grid()
+    starts, offsets = _transitions(tz, int(ts.min()), int(ts.max()))
+    return _to_grid(_cells(_local(ts, starts, offsets)))
+
+
+def voice_grid(sessions: Sequence[tuple[int, int]], tz: tzinfo) -> Grid:
+    pairs = np.asarray(sessions, dtype=np.int64).reshape(-1, 2)
+    epoch = pairs[:, 0]
+    end = np.maximum(pairs[:, 1], epoch)
+    sid = np.arange(len(pairs))
+    live = epoch < end
+    sid, epoch, end = sid[live], epoch[live], end[live]
+    if sid.size == 0:
+        return _empty_grid()
+    starts, offsets = _transitions(tz, int(epoch.min()), int(end.max()))
+
+    # Each round cuts every still-open session at its next local hour
+    # boundary, mirroring the walk in analysis.voice_grid one step at a time.
+    seg_sid, seg_round, seg_cell, seg_minutes = [], [], [], []
+    rnd = 0
+    while sid.size:
+        local = _local(epoch, starts, offsets)
+        seg_end = np.minimum(epoch + (3600 - local % 3600), end)
+        seg_sid.append(sid)
+        seg_round.append(np.full(sid.size, rnd))
+        seg_cell.append(_cells(local))
+        seg_minutes.append((seg_end - epoch) / 60.0)
+        epoch = seg_end
+        more = epoch < end
+        sid, epoch, end = sid[more], epoch[more], end[more]
+        rnd += 1
+
+    # bincount adds weights in array order, so putting segments back in
+    # session-then-time order reproduces the Python loop's float sums exactly.
+    order = np.lexsort((np.concatenate(seg_round), np.concatenate(seg_sid)))
+    return _to_grid(np.concatenate(seg_cell)[order], np.concatenate(seg_minutes)[order])
@@ -23,7 +23,8 @@ CREATE TABLE IF NOT EXISTS voice_sessions (
   start_utc          INTEGER NOT NULL,
   end_utc            INTEGER,          -- NULL = open (in progress)
   last_heartbeat_utc INTEGER,          -- updated while open; used for crash recovery
-  source             TEXT NOT NULL DEFAULT 'live'  -- 'live' or 'backlog' (/backlog vc)
+  source             TEXT NOT NULL DEFAULT 'live',  -- 'live' or 'backlog' (/backlog vc)
+  run_id             INTEGER           -- runs.id of the process that opened it
 );
 
 -- One row per stretch a member played a given game (Discord Rich Presence).
@@ -36,9 +37,48 @@ CREATE TABLE IF NOT EXISTS game_sessions (
   game               TEXT NOT NULL,    -- activity name, e.g. 'VALORANT'
   start_utc          INTEGER NOT NULL,
   end_utc            INTEGER,          -- NULL = open (in progress)
-  last_heartbeat_utc INTEGER           -- updated while open; used for crash recovery
+  last_heartbeat_utc INTEGER,          -- updated while open; used for crash recovery
+  run_id             INTEGER           -- runs.id of the process that opened it
+);
+
+-- One row per bot process. alive_utc is bumped every heartbeat, so after a
+-- crash every session a run left open is closed at its run's last sign of
+-- life — one row written per tick instead of one per open session.
+CREATE TABLE IF NOT EXISTS runs (
+  id           INTEGER PRIMARY KEY AUTOINCREMENT,
+  started_utc  INTEGER NOT NULL,
+  alive_utc    INTEGER NOT NULL
 );
 
+-- Per-member activity rolled up into 15-minute UTC buckets (bucket =
+-- ts_utc / 900), so charts read a few thousand rows instead of every message
+-- ever sent. Message counts are kept in step with `messages` by the triggers
+-- below; voice seconds are added by storage.py as sessions close.
+CREATE TABLE IF NOT EXISTS activity_rollup (
+  guild_id       INTEGER NOT NULL,
+  user_id        INTEGER NOT NULL,
+  bucket         INTEGER NOT NULL,
+  messages       INTEGER NOT NULL DEFAULT 0,
+  voice_seconds  INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (guild_id, user_id, bucket)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_messages_rollup_ins AFTER INSERT ON messages
+BEGIN
+  INSERT INTO activity_rollup (guild_id, user_id, bucket, messages)
+  VALUES (NEW.guild_id, NEW.user_id, NEW.ts_utc / 900, 1)
+  ON CONFLICT(guild_id, user_id, bucket) DO UPDATE SET messages = messages + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_messages_rollup_del AFTER DELETE ON messages
+BEGIN
+  UPDATE activity_rollup SET messages = messages - 1
+  WHERE guild_id = OLD.guild_id AND user_id = OLD.user_id AND bucket = OLD.ts_utc / 900;
+  DELETE FROM activity_rollup
+  WHERE guild_id = OLD.guild_id AND user_id = OLD.user_id AND bucket = OLD.ts_utc / 900
+    AND messages <= 0 AND voice_seconds <= 0;
+END;
+
 -- Bot-wide settings as key/value pairs, e.g. 'admin_channel_id'. Not
 -- guild-scoped: the backup this feeds contains every guild's data.
 CREATE TABLE IF NOT EXISTS settings (
@@ -5,24 +5,126 @@ nothing else. All timestamps in and out are Unix epoch seconds, UTC.
 """
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import AsyncIterator, Iterable, Sequence
+from zoneinfo import ZoneInfo
 
 import aiosqlite
 
+from . import analysis
+
 _SCHEMA_PATH = Path(__file__).with_name("schema.sql")
 
+log = logging.getLogger("iris.storage")
+
+MessageRow = tuple[int, int, int, int, int | None]  # (user, guild, channel, ts_utc, message_id)
+
+
+def _recovered_end(table: str) -> str:
+    """SQL for where an orphaned session of `table` ends: the later of its
+    own last heartbeat and its run's liveness watermark, never before it
+    started."""
+    return (
+        f"MAX(COALESCE(last_heartbeat_utc, start_utc), COALESCE("
+        f"(SELECT alive_utc FROM runs WHERE runs.id = {table}.run_id), start_utc))"
+    )
+
+
+def _json_rows(width: int, extra: str = "") -> str:
+    """A SELECT unpacking a JSON array of `width`-long rows bound to one `?`,
+    so a whole batch rides in a single statement (and a single parameter)."""
+    cols = ", ".join(f"json_extract(value, '$[{i}]')" for i in range(width))
+    return f"SELECT {cols}{extra} FROM json_each(?)"
+
+
+def _local_cell(ts_utc: int | None, tz_name: str) -> int | None:
+    """SQL function iris_cell(ts_utc, tz): the instant's local grid cell,
+    weekday * 24 + hour (weekday 0 = Monday). NULL for an unknown zone."""
+    if ts_utc is None:
+        return None
+    try:
+        tz = ZoneInfo(tz_name)
+    except (KeyError, ValueError):
+        return None
+    weekday, hour = analysis.bucketer(tz).cell(ts_utc)
+    return weekday * 24 + hour
+
+
+def _grid_from_cells(rows: Iterable[tuple[int | None, float]]) -> analysis.Grid:
+    grid = [[0.0] * 24 for _ in range(7)]
+    for cell, value in rows:
+        if cell is not None:
+            grid[cell // 24][cell % 24] += value
+    return grid
+
 
 class Storage:
-    def __init__(self, db_path: str):
+    def __init__(
+        self,
+        db_path: str,
+        readers: int = 2,
+        ingest_max: int = 10_000,
+        ingest_batch: int = 500,
+        ingest_interval: float = 0.25,
+    ):
         self._db_path = db_path
         self._db: aiosqlite.Connection | None = None
+        # One writer connection plus a small pool of read-only ones. WAL lets
+        # readers run alongside the writer, so /stats queries don't queue
+        # behind capture writes (or vice versa). readers=0 reads on the writer.
+        self._reader_count = readers
+        self._readers: asyncio.Queue[aiosqlite.Connection] | None = None
+        self._reader_conns: list[aiosqlite.Connection] = []
+        # Write-behind message ingest: on_message only appends here, and one
+        # background task commits the backlog in batches (see queue_message).
+        self._ingest_max = ingest_max
+        self._ingest_batch = ingest_batch
+        self._ingest_interval = ingest_interval
+        self._pending: deque[MessageRow] = deque()
+        self._has_pending = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._has_space = asyncio.Event()
+        self._has_space.set()
+        self._ingest_lock = asyncio.Lock()
+        self._ingest_task: asyncio.Task | None = None
+        self._closing = False
+        self._ingest_stats = {
+            "queued": 0, "written": 0, "batches": 0, "failed": 0,
+            "waits": 0, "peak_depth": 0, "last_batch_ms": 0.0,
+        }
+        # This process's row in `runs` once start_run() is called; sessions
+        # opened after that are tagged with it for crash recovery.
+        self.run_id: int | None = None
 
     async def open(self) -> None:
         self._db = await aiosqlite.connect(self._db_path)
         await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._register_functions(self._db)
         await self._migrate()
         await self._db.executescript(_SCHEMA_PATH.read_text(encoding="utf-8"))
         await self._db.commit()
+        if self._rollup_missing:
+            await self.rebuild_activity_rollup()
+        if self._reader_count > 0:
+            uri = Path(self._db_path).resolve().as_uri() + "?mode=ro"
+            self._readers = asyncio.Queue()
+            for _ in range(self._reader_count):
+                conn = await aiosqlite.connect(uri, uri=True)
+                await self._register_functions(conn)
+                self._reader_conns.append(conn)
+                self._readers.put_nowait(conn)
+        self._closing = False
+        self._ingest_task = asyncio.create_task(self._ingest_loop())
+
+    @staticmethod
+    async def _register_functions(conn: aiosqlite.Connection) -> None:
+        await conn.create_function("iris_cell", 2, _local_cell, deterministic=True)
 
     async def _migrate(self) -> None:
         """Bring pre-existing databases up to the current schema before the
@@ -33,6 +135,9 @@ class Storage:
                 return [row[1] for row in await cur.fetchall()]
 
         msg_cols = await columns("messages")
+        # Databases from before the rollup existed get it built once, from
+        # the raw rows, right after the schema script creates it.
+        self._rollup_missing = bool(msg_cols) and not await columns("activity_rollup")
         if msg_cols and "message_id" not in msg_cols:
             await self._db.execute("ALTER TABLE messages ADD COLUMN message_id INTEGER")
         vc_cols = await columns("voice_sessions")
@@ -40,12 +145,30 @@ class Storage:
             await self._db.execute(
                 "ALTER TABLE voice_sessions ADD COLUMN source TEXT NOT NULL DEFAULT 'live'"
             )
+        if vc_cols and "run_id" not in vc_cols:
+            await self._db.execute("ALTER TABLE voice_sessions ADD COLUMN run_id INTEGER")
+        game_cols = await columns("game_sessions")
+        if game_cols and "run_id" not in game_cols:
+            await self._db.execute("ALTER TABLE game_sessions ADD COLUMN run_id INTEGER")
         vote_opt_cols = await columns("vote_options")
         if vote_opt_cols and "role_id" not in vote_opt_cols:
             await self._db.execute("ALTER TABLE vote_options ADD COLUMN role_id INTEGER")
 
     async def close(self) -> None:
+        if self._ingest_task is not None:
+            # Let the flusher finish whatever batch it's in the middle of
+            # rather than cancelling it between the insert and the commit.
+            self._closing = True
+            self._has_pending.set()
+            self._batch_full.set()
+            await self._ingest_task
+            self._ingest_task = None
+        for conn in self._reader_conns:
+            await conn.close()
+        self._reader_conns = []
+        self._readers = None
         if self._db is not None:
+            await self.flush_messages()
             await self._db.close()
             self._db = None
 
@@ -54,19 +177,140 @@ class Storage:
         assert self._db is not None, "Storage.open() not called"
         return self._db
 
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a read-only connection from the pool for one query."""
+        if self._readers is None:
+            yield self.db
+            return
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    async def _read_all(self, sql: str, params: Sequence = ()) -> list[tuple]:
+        async with self._reader() as db:
+            async with db.execute(sql, params) as cur:
+                return await cur.fetchall()
+
+    async def _read_one(self, sql: str, params: Sequence = ()) -> tuple | None:
+        async with self._reader() as db:
+            async with db.execute(sql, params) as cur:
+                return await cur.fetchone()
+
     async def backup_to(self, path: str) -> None:
         """Write a consistent point-in-time snapshot of the whole database to
         `path`. Safe to run while the bot is live (VACUUM INTO takes its own
-        read transaction and produces a single self-contained file)."""
-        await self.db.execute("VACUUM INTO ?", (path,))
+        read transaction and produces a single self-contained file). Runs on a
+        pooled reader, so capture writes carry on meanwhile."""
+        async with self._reader() as db:
+            await db.execute("VACUUM INTO ?", (path,))
+
+    async def _write_returning(self, sql: str, params: Sequence = ()) -> list[tuple]:
+        """Execute a write with a RETURNING clause on the writer (no commit)."""
+        async with self.db.execute(sql, params) as cur:
+            return await cur.fetchall()
 
-    # -- settings -----------------------------------------------------------
+    # -- activity rollup ----------------------------------------------------
+    # 15-minute buckets per (guild, user). Message counts are maintained by
+    # triggers in schema.sql; voice seconds are added here, inside the same
+    # transaction that closes (or imports, or deletes) a session.
 
-    async def get_setting(self, key: str) -> str | None:
+    async def _roll_voice(
+        self, sessions: Iterable[tuple[int, int, int, int]], sign: int = 1
+    ) -> None:
+        """Add (sign=1) or remove (sign=-1) closed (guild_id, user_id,
+        start_utc, end_utc) sessions' seconds. Doesn't commit."""
+        deltas: dict[tuple[int, int, int], int] = {}
+        for guild_id, user_id, start, end in sessions:
+            for b, seconds in analysis.voice_buckets(start, end):
+                key = (guild_id, user_id, b // analysis.BUCKET_SECONDS)
+                deltas[key] = deltas.get(key, 0) + sign * seconds
+        if not deltas:
+            return
+        await self.db.executemany(
+            "INSERT INTO activity_rollup (guild_id, user_id, bucket, voice_seconds)"
+            " VALUES (?, ?, ?, ?) ON CONFLICT(guild_id, user_id, bucket)"
+            " DO UPDATE SET voice_seconds = voice_seconds + excluded.voice_seconds",
+            [(*key, seconds) for key, seconds in deltas.items()],
+        )
+        if sign < 0:
+            await self.db.executemany(
+                "DELETE FROM activity_rollup WHERE guild_id = ? AND user_id = ? AND bucket = ?"
+                " AND messages <= 0 AND voice_seconds <= 0",
+                list(deltas),
+            )
+
+    async def rebuild_activity_rollup(self) -> None:
+        """Recompute the whole rollup from raw rows."""
+        await self.db.execute("DELETE FROM activity_rollup")
+        await self.db.execute(
+            "INSERT INTO activity_rollup (guild_id, user_id, bucket, messages)"
+            " SELECT guild_id, user_id, ts_utc / 900, COUNT(*) FROM messages"
+            " GROUP BY guild_id, user_id, ts_utc / 900"
+        )
         async with self.db.execute(
-            "SELECT value FROM settings WHERE key = ?", (key,)
+            "SELECT guild_id, user_id, start_utc, end_utc FROM voice_sessions"
+            " WHERE end_utc IS NOT NULL"
         ) as cur:
-            row = await cur.fetchone()
+            while rows := await cur.fetchmany(5000):
+                await self._roll_voice(rows)
+        await self.db.commit()
+
+    async def get_activity_buckets(
+        self, user_id: int, guild_id: int
+    ) -> list[tuple[int, int, int]]:
+        """Rows of (bucket_start_utc, messages, voice_seconds), oldest first."""
+        return await self._read_all(
+            "SELECT bucket * 900, messages, voice_seconds FROM activity_rollup"
+            " WHERE guild_id = ? AND user_id = ? ORDER BY bucket",
+            (guild_id, user_id),
+        )
+
+    async def get_activity_grids(
+        self, user_id: int, guild_id: int, tz_name: str
+    ) -> tuple[analysis.Grid, analysis.Grid]:
+        """(message grid, voice-minutes grid) local to `tz_name`, bucketed
+        inside SQLite: at most 168 rows come back, however long the history."""
+        rows = await self._read_all(
+            "SELECT iris_cell(bucket * 900, ?) AS cell, SUM(messages), SUM(voice_seconds)"
+            " FROM activity_rollup WHERE guild_id = ? AND user_id = ? GROUP BY cell",
+            (tz_name, guild_id, user_id),
+        )
+        return (
+            _grid_from_cells((cell, float(messages)) for cell, messages, _ in rows),
+            _grid_from_cells((cell, seconds / 60.0) for cell, _, seconds in rows),
+        )
+
+    async def get_message_grid(
+        self, user_id: int, guild_id: int, tz_name: str, since: int | None = None
+    ) -> analysis.Grid:
+        """Message counts per [weekday][hour] local to `tz_name`, straight
+        from the raw rows with a GROUP BY (exact even for a `since` cutoff
+        that doesn't fall on a rollup bucket)."""
+        sql = (
+            "SELECT iris_cell(ts_utc, ?) AS cell, COUNT(*) FROM messages"
+            " WHERE user_id = ? AND guild_id = ?"
+        )
+        params: list = [tz_name, user_id, guild_id]
+        if since is not None:
+            sql += " AND ts_utc >= ?"
+            params.append(since)
+        rows = await self._read_all(sql + " GROUP BY cell", params)
+        return _grid_from_cells((cell, float(count)) for cell, count in rows)
+
+    async def last_message_utc(self, user_id: int, guild_id: int) -> int | None:
+        row = await self._read_one(
+            "SELECT MAX(ts_utc) FROM messages WHERE user_id = ? AND guild_id = ?",
+            (user_id, guild_id),
+        )
+        return row[0] if row else None
+
+    # -- settings -----------------------------------------------------------
+
+    async def get_setting(self, key: str) -> str | None:
+        row = await self._read_one("SELECT value FROM settings WHERE key = ?", (key,))
         return row[0] if row else None
 
     async def set_setting(self, key: str, value: str) -> None:
@@ -122,12 +366,11 @@ class Storage:
 
     async def get_vote(self, vote_id: int) -> dict | None:
         """The vote row as a dict, or None if it doesn't exist."""
-        async with self.db.execute(
+        row = await self._read_one(
             "SELECT id, guild_id, channel_id, message_id, creator_id, title,"
             " anonymous, multiple, closed, created_utc FROM votes WHERE id = ?",
             (vote_id,),
-        ) as cur:
-            row = await cur.fetchone()
+        )
         if row is None:
             return None
         keys = ("id", "guild_id", "channel_id", "message_id", "creator_id", "title",
@@ -139,21 +382,19 @@ class Storage:
     ) -> list[tuple[int, str, int | None, str | None]]:
         """Rows of (idx, label, role_id, message) in button order. message is the
         ephemeral note shown to the voter when they pick that option."""
-        async with self.db.execute(
+        return await self._read_all(
             "SELECT idx, label, role_id, dm FROM vote_options WHERE vote_id = ? ORDER BY idx",
             (vote_id,),
-        ) as cur:
-            return await cur.fetchall()
+        )
 
     async def get_ballots(self, vote_id: int) -> dict[int, list[int]]:
         """{option idx -> [user_id, …]} in the order votes were cast."""
-        async with self.db.execute(
+        tally: dict[int, list[int]] = {}
+        for idx, user_id in await self._read_all(
             "SELECT idx, user_id FROM vote_ballots WHERE vote_id = ? ORDER BY rowid",
             (vote_id,),
-        ) as cur:
-            tally: dict[int, list[int]] = {}
-            for idx, user_id in await cur.fetchall():
-                tally.setdefault(idx, []).append(user_id)
+        ):
+            tally.setdefault(idx, []).append(user_id)
         return tally
 
     async def cast_ballot(
@@ -195,10 +436,9 @@ class Storage:
     async def get_open_votes(self) -> list[tuple[int, int]]:
         """(vote_id, message_id) for open votes that have been posted — used to
         re-attach their button views after a restart."""
-        async with self.db.execute(
+        return await self._read_all(
             "SELECT id, message_id FROM votes WHERE closed = 0 AND message_id IS NOT NULL"
-        ) as cur:
-            return await cur.fetchall()
+        )
 
     # -- /unmute shields ----------------------------------------------------
 
@@ -232,11 +472,10 @@ class Storage:
     async def get_active_unmute_shields(self, now: int) -> list[tuple[int, int, int]]:
         """(guild_id, user_id, expires_utc) for shields that haven't run out —
         read once at startup to rebuild the in-memory set."""
-        async with self.db.execute(
+        return await self._read_all(
             "SELECT guild_id, user_id, expires_utc FROM unmute_shields WHERE expires_utc > ?",
             (now,),
-        ) as cur:
-            return await cur.fetchall()
+        )
 
     async def purge_expired_unmute_shields(self, now: int) -> int:
         cur = await self.db.execute(
@@ -247,11 +486,10 @@ class Storage:
 
     async def get_last_unmute_use(self, guild_id: int, user_id: int) -> int | None:
         """When this member last spent a /unmute here, or None if never."""
-        async with self.db.execute(
+        row = await self._read_one(
             "SELECT last_utc FROM unmute_uses WHERE guild_id = ? AND user_id = ?",
             (guild_id, user_id),
-        ) as cur:
-            row = await cur.fetchone()
+        )
         return row[0] if row else None
 
     async def record_unmute_use(self, guild_id: int, user_id: int, ts_utc: int) -> None:
@@ -273,10 +511,7 @@ class Storage:
         await self.db.commit()
 
     async def get_timezone(self, user_id: int) -> str | None:
-        async with self.db.execute(
-            "SELECT tz FROM users WHERE user_id = ?", (user_id,)
-        ) as cur:
-            row = await cur.fetchone()
+        row = await self._read_one("SELECT tz FROM users WHERE user_id = ?", (user_id,))
         return row[0] if row else None
 
     async def clear_timezone(self, user_id: int) -> None:
@@ -300,6 +535,82 @@ class Storage:
         )
         await self.db.commit()
 
+    # -- write-behind message ingest -----------------------------------------
+    # One INSERT + commit per chat message caps throughput at commit latency
+    # and keeps the connection busy for /stats. Instead messages queue in
+    # memory and a background task writes them with one executemany and one
+    # commit per batch, whenever a batch fills or `ingest_interval` passes.
+
+    async def queue_message(
+        self,
+        user_id: int,
+        guild_id: int,
+        channel_id: int,
+        ts_utc: int,
+        message_id: int | None = None,
+    ) -> None:
+        """Queue one message for the background writer. Returns immediately
+        unless the queue is full, in which case it waits for the writer to
+        catch up (backpressure) rather than dropping anything."""
+        stats = self._ingest_stats
+        while len(self._pending) >= self._ingest_max:
+            stats["waits"] += 1
+            self._has_space.clear()
+            self._batch_full.set()
+            await self._has_space.wait()
+        self._pending.append((user_id, guild_id, channel_id, ts_utc, message_id))
+        stats["queued"] += 1
+        stats["peak_depth"] = max(stats["peak_depth"], len(self._pending))
+        self._has_pending.set()
+        if len(self._pending) >= self._ingest_batch:
+            self._batch_full.set()
+
+    async def flush_messages(self) -> None:
+        """Write everything queued so far. Returns once it's committed, so
+        callers (shutdown, tests) can rely on it being on disk."""
+        async with self._ingest_lock:
+            while self._pending:
+                n = min(len(self._pending), self._ingest_batch)
+                batch = [self._pending.popleft() for _ in range(n)]
+                self._has_space.set()
+                started = time.perf_counter()
+                try:
+                    await self.db.executemany(
+                        "INSERT OR IGNORE INTO messages"
+                        " (user_id, guild_id, channel_id, ts_utc, message_id)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        batch,
+                    )
+                    await self.db.commit()
+                except Exception:
+                    self._ingest_stats["failed"] += len(batch)
+                    raise
+                self._ingest_stats["written"] += len(batch)
+                self._ingest_stats["batches"] += 1
+                self._ingest_stats["last_batch_ms"] = (time.perf_counter() - started) * 1000
+            self._has_pending.clear()
+            self._batch_full.clear()
+
+    def ingest_metrics(self) -> dict:
+        """Counters for the ingest queue: current and peak depth, rows queued
+        and written, batches, rows lost to failed batches, and how many times
+        a producer had to wait on a full queue."""
+        return {**self._ingest_stats, "depth": len(self._pending)}
+
+    async def _ingest_loop(self) -> None:
+        while not self._closing:
+            await self._has_pending.wait()
+            if not self._closing:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self._ingest_interval)
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                await self.flush_messages()
+            except Exception:
+                log.exception("Message ingest batch failed")
+                await asyncio.sleep(self._ingest_interval)
+
     async def log_messages_bulk(
         self, rows: list[tuple[int, int, int, int, int]]
     ) -> int:
@@ -327,29 +638,78 @@ class Storage:
 
     async def open_voice_session(
         self, user_id: int, guild_id: int, channel_id: int, start_utc: int
-    ) -> None:
+    ) -> int:
+        """Open a session and return its row id (the bot's live registry keys
+        heartbeats off it)."""
         # Defensive: a missed leave event would otherwise leave two open
         # sessions for one user. Close any stale one at its last heartbeat.
-        await self.db.execute(
-            "UPDATE voice_sessions"
-            " SET end_utc = COALESCE(last_heartbeat_utc, start_utc)"
-            " WHERE user_id = ? AND guild_id = ? AND end_utc IS NULL",
-            (user_id, guild_id),
+        await self._roll_voice(await self._write_returning(
+            f"UPDATE voice_sessions SET end_utc = MIN({_recovered_end('voice_sessions')}, ?)"
+            " WHERE user_id = ? AND guild_id = ? AND end_utc IS NULL"
+            " RETURNING guild_id, user_id, start_utc, end_utc",
+            (start_utc, user_id, guild_id),
+        ))
+        cur = await self.db.execute(
+            "INSERT INTO voice_sessions (user_id, guild_id, channel_id, start_utc, run_id)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (user_id, guild_id, channel_id, start_utc, self.run_id),
         )
-        await self.db.execute(
-            "INSERT INTO voice_sessions (user_id, guild_id, channel_id, start_utc)"
-            " VALUES (?, ?, ?, ?)",
-            (user_id, guild_id, channel_id, start_utc),
+        await self.db.commit()
+        return cur.lastrowid
+
+    async def open_voice_sessions_bulk(
+        self, rows: Sequence[tuple[int, int, int]], start_utc: int
+    ) -> dict[tuple[int, int], int]:
+        """Open a session for every (user_id, guild_id, channel_id) at once —
+        the startup snapshot. Stale open rows for those members are closed
+        first, as in open_voice_session, all in one transaction. Returns
+        {(guild_id, user_id): row id}."""
+        if not rows:
+            return {}
+        payload = json.dumps([list(row) for row in rows])
+        await self._roll_voice(await self._write_returning(
+            f"UPDATE voice_sessions SET end_utc = MIN({_recovered_end('voice_sessions')}, ?)"
+            f" WHERE end_utc IS NULL AND (user_id, guild_id) IN ({_json_rows(2)})"
+            " RETURNING guild_id, user_id, start_utc, end_utc",
+            (start_utc, payload),
+        ))
+        opened = await self._write_returning(
+            "INSERT INTO voice_sessions (user_id, guild_id, channel_id, start_utc, run_id)"
+            f" {_json_rows(3, ', ?, ?')}"
+            " RETURNING guild_id, user_id, id",
+            (start_utc, self.run_id, payload),
         )
         await self.db.commit()
+        return {(guild_id, user_id): row_id for guild_id, user_id, row_id in opened}
 
     async def close_voice_session(self, user_id: int, guild_id: int, end_utc: int) -> None:
-        await self.db.execute(
+        await self._roll_voice(await self._write_returning(
             "UPDATE voice_sessions SET end_utc = ?"
-            " WHERE user_id = ? AND guild_id = ? AND end_utc IS NULL",
+            " WHERE user_id = ? AND guild_id = ? AND end_utc IS NULL"
+            " RETURNING guild_id, user_id, start_utc, end_utc",
             (end_utc, user_id, guild_id),
+        ))
+        await self.db.commit()
+
+    # -- liveness ------------------------------------------------------------
+
+    async def start_run(self, now: int) -> int:
+        """Register this process in `runs`; sessions opened from here on carry
+        its id, and mark_alive() moves its watermark."""
+        cur = await self.db.execute(
+            "INSERT INTO runs (started_utc, alive_utc) VALUES (?, ?)", (now, now)
         )
         await self.db.commit()
+        self.run_id = cur.lastrowid
+        return self.run_id
+
+    async def mark_alive(self, ts: int) -> None:
+        """One-row heartbeat: every open session of this run is known to be
+        live up to `ts`."""
+        if self.run_id is None:
+            return
+        await self.db.execute("UPDATE runs SET alive_utc = ? WHERE id = ?", (ts, self.run_id))
+        await self.db.commit()
 
     async def heartbeat(self, active_user_ids: list[int], ts: int) -> None:
         if not active_user_ids:
@@ -362,23 +722,42 @@ class Storage:
         )
         await self.db.commit()
 
+    async def heartbeat_voice_rows(self, session_ids: Iterable[int], ts: int) -> None:
+        """Bump last_heartbeat_utc on open voice sessions by row id — the
+        primary key lookup the live registry makes possible."""
+        await self._heartbeat_rows("voice_sessions", session_ids, ts)
+
+    async def _heartbeat_rows(self, table: str, session_ids: Iterable[int], ts: int) -> None:
+        rows = [(ts, session_id) for session_id in session_ids]
+        if not rows:
+            return
+        await self.db.executemany(
+            f"UPDATE {table} SET last_heartbeat_utc = ? WHERE id = ? AND end_utc IS NULL",
+            rows,
+        )
+        await self.db.commit()
+
     async def reconcile_open_sessions(self, now: int) -> int:
         """Close sessions left open by a previous run at their last heartbeat
-        (start time if they never beat). Returns the number closed."""
-        cur = await self.db.execute(
-            "UPDATE voice_sessions"
-            " SET end_utc = MIN(COALESCE(last_heartbeat_utc, start_utc), ?)"
-            " WHERE end_utc IS NULL",
+        or their run's liveness watermark, whichever is later (start time if
+        neither). Returns the number closed."""
+        closed = await self._write_returning(
+            f"UPDATE voice_sessions SET end_utc = MIN({_recovered_end('voice_sessions')}, ?)"
+            " WHERE end_utc IS NULL"
+            " RETURNING guild_id, user_id, start_utc, end_utc",
             (now,),
         )
+        await self._roll_voice(closed)
         await self.db.commit()
-        return cur.rowcount
+        return len(closed)
 
     async def close_all_open_sessions(self, now: int) -> None:
         """Graceful shutdown: everyone in VC right now leaves at `now`."""
-        await self.db.execute(
-            "UPDATE voice_sessions SET end_utc = ? WHERE end_utc IS NULL", (now,)
-        )
+        await self._roll_voice(await self._write_returning(
+            "UPDATE voice_sessions SET end_utc = ? WHERE end_utc IS NULL"
+            " RETURNING guild_id, user_id, start_utc, end_utc",
+            (now,),
+        ))
         await self.db.commit()
 
     async def add_voice_sessions_bulk(
@@ -396,35 +775,36 @@ class Storage:
             " VALUES (?, ?, ?, ?, ?, ?)",
             [(u, guild_id, c, s, e, source) for u, c, s, e in rows],
         )
+        await self._roll_voice((guild_id, u, s, e) for u, _c, s, e in rows)
         await self.db.commit()
         return cur.rowcount
 
     async def delete_voice_sessions_by_source(self, guild_id: int, source: str) -> int:
         """Remove a previous import wholesale, so re-running it can't duplicate."""
-        cur = await self.db.execute(
-            "DELETE FROM voice_sessions WHERE guild_id = ? AND source = ?",
+        deleted = await self._write_returning(
+            "DELETE FROM voice_sessions WHERE guild_id = ? AND source = ?"
+            " RETURNING guild_id, user_id, start_utc, end_utc",
             (guild_id, source),
         )
+        await self._roll_voice([row for row in deleted if row[3] is not None], sign=-1)
         await self.db.commit()
-        return cur.rowcount
+        return len(deleted)
 
     async def earliest_live_voice_start(self, guild_id: int) -> int | None:
         """When Iris's own voice capture began — imports are capped here so
         they can never overlap live-recorded sessions."""
-        async with self.db.execute(
+        row = await self._read_one(
             "SELECT MIN(start_utc) FROM voice_sessions WHERE guild_id = ? AND source = 'live'",
             (guild_id,),
-        ) as cur:
-            row = await cur.fetchone()
+        )
         return row[0] if row else None
 
     async def get_open_sessions(self) -> list[tuple[int, int, int, int]]:
         """Rows of (user_id, guild_id, channel_id, start_utc) still open."""
-        async with self.db.execute(
+        return await self._read_all(
             "SELECT user_id, guild_id, channel_id, start_utc"
             " FROM voice_sessions WHERE end_utc IS NULL"
-        ) as cur:
-            return await cur.fetchall()
+        )
 
     # -- game presence ------------------------------------------------------
     # Mirrors the voice lifecycle exactly, keyed by (user, guild, game) so a
@@ -432,21 +812,44 @@ class Storage:
 
     async def open_game_session(
         self, user_id: int, guild_id: int, game: str, start_utc: int
-    ) -> None:
+    ) -> int:
+        """Open a session and return its row id."""
         # Defensive: a missed "stopped playing" would otherwise leave two open
         # sessions for the same game. Close any stale one at its last heartbeat.
         await self.db.execute(
-            "UPDATE game_sessions"
-            " SET end_utc = COALESCE(last_heartbeat_utc, start_utc)"
+            f"UPDATE game_sessions SET end_utc = MIN({_recovered_end('game_sessions')}, ?)"
             " WHERE user_id = ? AND guild_id = ? AND game = ? AND end_utc IS NULL",
-            (user_id, guild_id, game),
+            (start_utc, user_id, guild_id, game),
         )
+        cur = await self.db.execute(
+            "INSERT INTO game_sessions (user_id, guild_id, game, start_utc, run_id)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (user_id, guild_id, game, start_utc, self.run_id),
+        )
+        await self.db.commit()
+        return cur.lastrowid
+
+    async def open_game_sessions_bulk(
+        self, rows: Sequence[tuple[int, int, str]], start_utc: int
+    ) -> dict[tuple[int, int, str], int]:
+        """open_voice_sessions_bulk for (user_id, guild_id, game) rows.
+        Returns {(guild_id, user_id, game): row id}."""
+        if not rows:
+            return {}
+        payload = json.dumps([list(row) for row in rows])
         await self.db.execute(
-            "INSERT INTO game_sessions (user_id, guild_id, game, start_utc)"
-            " VALUES (?, ?, ?, ?)",
-            (user_id, guild_id, game, start_utc),
+            f"UPDATE game_sessions SET end_utc = MIN({_recovered_end('game_sessions')}, ?)"
+            f" WHERE end_utc IS NULL AND (user_id, guild_id, game) IN ({_json_rows(3)})",
+            (start_utc, payload),
+        )
+        opened = await self._write_returning(
+            "INSERT INTO game_sessions (user_id, guild_id, game, start_utc, run_id)"
+            f" {_json_rows(3, ', ?, ?')}"
+            " RETURNING guild_id, user_id, game, id",
+            (start_utc, self.run_id, payload),
         )
         await self.db.commit()
+        return {(guild_id, user_id, game): row_id for guild_id, user_id, game, row_id in opened}
 
     async def close_game_session(
         self, user_id: int, guild_id: int, game: str, end_utc: int
@@ -469,12 +872,15 @@ class Storage:
         )
         await self.db.commit()
 
+    async def heartbeat_game_rows(self, session_ids: Iterable[int], ts: int) -> None:
+        """Bump last_heartbeat_utc on open game sessions by row id."""
+        await self._heartbeat_rows("game_sessions", session_ids, ts)
+
     async def reconcile_open_game_sessions(self, now: int) -> int:
-        """Close game sessions left open by a previous run at their last
-        heartbeat (start time if they never beat). Returns the number closed."""
+        """Close game sessions left open by a previous run, like
+        reconcile_open_sessions. Returns the number closed."""
         cur = await self.db.execute(
-            "UPDATE game_sessions"
-            " SET end_utc = MIN(COALESCE(last_heartbeat_utc, start_utc), ?)"
+            f"UPDATE game_sessions SET end_utc = MIN({_recovered_end('game_sessions')}, ?)"
             " WHERE end_utc IS NULL",
             (now,),
         )
@@ -490,11 +896,10 @@ class Storage:
 
     async def get_open_game_sessions(self) -> list[tuple[int, int, str, int]]:
         """Rows of (user_id, guild_id, game, start_utc) still open."""
-        async with self.db.execute(
+        return await self._read_all(
             "SELECT user_id, guild_id, game, start_utc"
             " FROM game_sessions WHERE end_utc IS NULL"
-        ) as cur:
-            return await cur.fetchall()
+        )
 
     async def get_game_sessions(
         self, user_id: int, guild_id: int, since: int | None = None
@@ -508,8 +913,7 @@ class Storage:
         if since is not None:
             sql += " AND end_utc >= ?"
             params.append(since)
-        async with self.db.execute(sql + " ORDER BY start_utc", params) as cur:
-            return await cur.fetchall()
+        return await self._read_all(sql + " ORDER BY start_utc", params)
 
     # -- reads --------------------------------------------------------------
 
@@ -522,8 +926,7 @@ class Storage:
         if since is not None:
             sql += " AND ts_utc >= ?"
             params.append(since)
-        async with self.db.execute(sql + " ORDER BY ts_utc", params) as cur:
-            return await cur.fetchall()
+        return await self._read_all(sql + " ORDER BY ts_utc", params)
 
     async def get_voice_sessions(
         self, user_id: int, guild_id: int, since: int | None = None
@@ -537,8 +940,7 @@ class Storage:
         if since is not None:
             sql += " AND end_utc >= ?"
             params.append(since)
-        async with self.db.execute(sql + " ORDER BY start_utc", params) as cur:
-            return await cur.fetchall()
+        return await self._read_all(sql + " ORDER BY start_utc", params)
 
     # -- privacy ------------------------------------------------------------
 
@@ -552,6 +954,7 @@ class Storage:
         await self.db.execute("DELETE FROM messages WHERE user_id = ?", (user_id,))
         await self.db.execute("DELETE FROM voice_sessions WHERE user_id = ?", (user_id,))
         await self.db.execute("DELETE FROM game_sessions WHERE user_id = ?", (user_id,))
+        await self.db.execute("DELETE FROM activity_rollup WHERE user_id = ?", (user_id,))
         await self.db.commit()
 
     async def set_optin(self, user_id: int) -> None:
@@ -564,13 +967,11 @@ class Storage:
         await self.db.commit()
 
     async def is_opted_out(self, user_id: int) -> bool:
-        async with self.db.execute(
-            "SELECT opted_out FROM users WHERE user_id = ?", (user_id,)
-        ) as cur:
-            row = await cur.fetchone()
+        row = await self._read_one("SELECT opted_out FROM users WHERE user_id = ?", (user_id,))
         return bool(row and row[0])
 
     async def get_opted_out_ids(self) -> set[int]:
         """All opted-out user ids, for the in-memory capture filter."""
-        async with self.db.execute("SELECT user_id FROM users WHERE opted_out = 1") as cur:
-            return {row[0] for row in await cur.fetchall()}
+        return {row[0] for row in await self._read_all(
+            "SELECT user_id FROM users WHERE opted_out = 1"
+        )}
@@ -7,6 +7,7 @@ from datetime import date, datetime, timezone
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
+from iris.analysis import bucket_grids, to_buckets
 from iris.bot import _build_activity_png, _build_games_png, _build_stats_png
 
 OUT = Path(__file__).parent / "preview_out"
@@ -64,16 +65,20 @@ def main() -> None:
     OUT.mkdir(exist_ok=True)
     tz = ZoneInfo("Europe/London")
     msgs, sessions = fake_data()
+    buckets = to_buckets(msgs, sessions)
+    grids = bucket_grids(buckets, tz)
+    quiet_grids = bucket_grids(to_buckets(msgs[:400], []), tz)
 
     renders = {
         "activity.png": _build_activity_png(
-            "moonlace", msgs, sessions, tz, "Europe/London", None),
+            "moonlace", *grids, "Europe/London", None),
         "activity_friday.png": _build_activity_png(
-            "moonlace", msgs, sessions, tz, "Europe/London", 4),
+            "moonlace", *grids, "Europe/London", 4),
         "activity_no_vc.png": _build_activity_png(
-            "quietone", msgs[:400], [], tz, "Europe/London", None),
+            "quietone", *quiet_grids, "Europe/London", None),
         "stats.png": _build_stats_png(
-            "moonlace", msgs, sessions, tz, "Europe/London", date(2024, 11, 3)),
+            "moonlace", buckets, sessions, max(msgs), tz, "Europe/London",
+            date(2024, 11, 3)),
         "games.png": _build_games_png(
             "moonlace", fake_games(), "Top games · since 3 Nov 2024", None),
     }
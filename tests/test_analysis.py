@@ -5,9 +5,12 @@ Anchor date: Monday 2026-07-20 (UTC). Timezone facts used:
 - Europe/London springs forward 2026-03-29 01:00 UTC (01:00 -> 02:00 local)
   and falls back 2026-10-25 01:00 UTC (02:00 -> 01:00 local).
 """
+import random
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 
+import pytest
+
 from iris import analysis
 
 UTC = timezone.utc
@@ -115,6 +118,150 @@ def test_summary_fields():
     assert abs(s["vc_seconds_per_message"] - 2.5 * 3600 / 3) < 1e-9
 
 
+# -- rollup buckets -----------------------------------------------------------
+
+def _mixed_activity():
+    msgs = [
+        _epoch(2026, 3, 29, 0, 59), _epoch(2026, 3, 29, 1, 0),      # London spring-forward
+        _epoch(2026, 10, 25, 0, 45), _epoch(2026, 10, 25, 1, 10),   # London fall-back
+        _epoch(2026, 7, 20, 18, 29), _epoch(2026, 7, 20, 18, 31),   # Kolkata half hour
+        _epoch(2026, 7, 20, 23, 59, 59),
+    ]
+    sessions = [
+        (_epoch(2026, 3, 29, 0, 30), _epoch(2026, 3, 29, 1, 30)),
+        (_epoch(2026, 10, 25, 0, 30), _epoch(2026, 10, 25, 1, 30)),
+        (_epoch(2026, 7, 20, 14, 7), _epoch(2026, 7, 21, 3, 52)),
+        (_epoch(2026, 7, 22, 12), _epoch(2026, 7, 22, 12)),
+    ]
+    return msgs, sessions
+
+
+def test_voice_buckets_split_on_quarter_hours():
+    start = _epoch(2026, 7, 20, 14, 10)
+    assert list(analysis.voice_buckets(start, start + 1200)) == [
+        (_epoch(2026, 7, 20, 14), 300),
+        (_epoch(2026, 7, 20, 14, 15), 900),
+    ]
+    assert list(analysis.voice_buckets(start, start - 60)) == []
+
+
+def test_bucket_grids_match_raw_grids_across_zones():
+    msgs, sessions = _mixed_activity()
+    buckets = analysis.to_buckets(msgs, sessions)
+    for tz in (UTC, TOKYO, KOLKATA, LONDON):
+        msg_g, vc_g = analysis.bucket_grids(buckets, tz)
+        assert msg_g == analysis.message_grid(msgs, tz)
+        raw_vc = analysis.voice_grid(sessions, tz)
+        assert all(abs(a - b) < 1e-9 for ra, rb in zip(vc_g, raw_vc) for a, b in zip(ra, rb))
+
+
+def test_bucket_summary_matches_summary():
+    msgs, sessions = _mixed_activity()
+    buckets = analysis.to_buckets(msgs, sessions)
+    for tz in (UTC, KOLKATA, LONDON):
+        assert analysis.bucket_summary(buckets, sessions, max(msgs), tz) == \
+            analysis.summary(msgs, sessions, tz)
+
+
+def test_activity_single_pass_over_iterators():
+    msgs, sessions = _mixed_activity()
+    agg = analysis.Activity(LONDON)
+    agg.add_messages(iter(msgs))      # one-shot iterators: consumed exactly once
+    agg.add_sessions(iter(sessions))
+    msg_g, vc_g = agg.grids()
+    assert msg_g == analysis.message_grid(msgs, LONDON)
+    assert vc_g == analysis.voice_grid(sessions, LONDON)
+    assert agg.dates() == analysis.active_dates(msgs, sessions, LONDON)
+    assert agg.summary() == analysis.summary(msgs, sessions, LONDON)
+    assert agg.first_utc == min(msgs + [s for s, _ in sessions])
+    assert agg.last_utc == max(msgs + [e for _, e in sessions])
+
+
+# -- TzBucketer ---------------------------------------------------------------
+
+def test_bucketer_matches_datetime():
+    rng = random.Random(5)
+    instants = [rng.randint(_epoch(2020, 1, 1), _epoch(2030, 1, 1)) for _ in range(2000)]
+    instants += [_epoch(2026, 3, 29, 1) + d for d in (-1, 0, 1)]
+    instants += [_epoch(2026, 10, 25, 1) + d for d in (-1, 0, 1)]
+    for tz in (UTC, KOLKATA, LONDON, ZoneInfo("America/New_York")):
+        b = analysis.TzBucketer(tz)
+        for ts in instants:
+            local = datetime.fromtimestamp(ts, tz)
+            assert b.cell(ts) == (local.weekday(), local.hour)
+            assert b.date(ts) == local.date()
+
+
+def test_bucketers_are_shared_per_zone():
+    assert analysis.bucketer(LONDON) is analysis.bucketer(ZoneInfo("Europe/London"))
+    assert analysis.bucketer(LONDON) is not analysis.bucketer(TOKYO)
+
+
+def test_pure_python_grids_unchanged():
+    msgs, sessions = _mixed_activity()
+    for tz in (UTC, TOKYO, KOLKATA, LONDON):
+        assert analysis.message_grid(msgs, tz) == _pure_message_grid(msgs, tz)
+        assert analysis.voice_grid(sessions, tz) == _pure_voice_grid(sessions, tz)
+
+
+# -- NumPy engine -------------------------------------------------------------
+
+def _pure_message_grid(ts_list, tz):
+    grid = analysis._empty_grid()
+    for ts in ts_list:
+        local = datetime.fromtimestamp(ts, tz)
+        grid[local.weekday()][local.hour] += 1
+    return grid
+
+
+def _pure_voice_grid(sessions, tz):
+    # Reference walk with a datetime per hour boundary, the way voice_grid
+    # worked before TzBucketer.
+    grid = analysis._empty_grid()
+    for start, end in sessions:
+        epoch, end = start, max(end, start)
+        while epoch < end:
+            local = datetime.fromtimestamp(epoch, tz)
+            seg_end = min(epoch + 3600 - (local.minute * 60 + local.second), end)
+            grid[local.weekday()][local.hour] += (seg_end - epoch) / 60.0
+            epoch = seg_end
+    return grid
+
+
+def test_offset_segments_find_exact_dst_instants():
+    segments = analysis._offset_segments(
+        LONDON, _epoch(2026, 1, 1), _epoch(2026, 12, 31)
+    )
+    assert segments == [
+        (_epoch(2026, 1, 1), 0),
+        (_epoch(2026, 3, 29, 1), 3600),
+        (_epoch(2026, 10, 25, 1), 0),
+    ]
+
+
+def test_vector_engine_is_bit_identical():
+    fastgrid = pytest.importorskip("iris.fastgrid")
+    msgs, sessions = _mixed_activity()
+    rng = random.Random(3)
+    for _ in range(500):
+        start = rng.randint(_epoch(2025, 1, 1), _epoch(2027, 1, 1))
+        msgs.append(start)
+        sessions.append((start, start + rng.randint(-60, 30_000)))
+    for tz in (UTC, TOKYO, KOLKATA, LONDON):
+        assert fastgrid.message_grid(msgs, tz) == _pure_message_grid(msgs, tz)
+        assert fastgrid.voice_grid(sessions, tz) == _pure_voice_grid(sessions, tz)
+    assert fastgrid.voice_grid([], UTC) == analysis._empty_grid()
+
+
+def test_vector_engine_dst_and_fractional_cases():
+    fastgrid = pytest.importorskip("iris.fastgrid")
+    spring = (_epoch(2026, 3, 29, 0, 30), _epoch(2026, 3, 29, 1, 30))
+    fall = (_epoch(2026, 10, 25, 0, 30), _epoch(2026, 10, 25, 1, 30))
+    kolkata = (_epoch(2026, 7, 20, 14), _epoch(2026, 7, 20, 15))
+    for session, tz in ((spring, LONDON), (fall, LONDON), (kolkata, KOLKATA)):
+        assert fastgrid.voice_grid([session], tz) == _pure_voice_grid([session], tz)
+
+
 # -- game totals --------------------------------------------------------------
 
 def test_game_totals_sums_and_sorts_by_time():
@@ -1,5 +1,8 @@
 """Storage repository tests against a real temporary SQLite file."""
 import asyncio
+import sqlite3
+
+import pytest
 
 from iris.storage import Storage
 
@@ -16,6 +19,206 @@ def test_unmute_shield_flow(tmp_path):
     asyncio.run(_unmute_flow(str(tmp_path / "unmute.db")))
 
 
+def test_reads_run_alongside_writes(tmp_path):
+    asyncio.run(_reader_flow(str(tmp_path / "readers.db")))
+
+
+async def _reader_flow(db_path: str) -> None:
+    s = Storage(db_path, readers=2)
+    await s.open()
+    await s.log_message(1, 10, 100, 1000)
+
+    # an uncommitted write on the writer neither blocks pooled readers nor
+    # leaks into what they see
+    await s.db.execute(
+        "INSERT INTO messages (user_id, guild_id, channel_id, ts_utc) VALUES (1, 10, 100, 2000)"
+    )
+    results = await asyncio.gather(*(s.get_messages(1, 10) for _ in range(4)))
+    assert all([ts for _, ts in rows] == [1000] for rows in results)
+    await s.db.commit()
+    assert [ts for _, ts in await s.get_messages(1, 10)] == [1000, 2000]
+
+    # readers are read-only
+    async with s._reader() as db:
+        with pytest.raises(sqlite3.OperationalError):
+            await db.execute("DELETE FROM messages")
+    await s.close()
+
+
+def test_activity_rollup(tmp_path):
+    asyncio.run(_rollup_flow(str(tmp_path / "rollup.db")))
+
+
+async def _rollup_flow(db_path: str) -> None:
+    s = Storage(db_path)
+    await s.open()
+
+    # messages roll up by trigger, duplicates included only once
+    await s.log_message(1, 10, 100, 900)
+    await s.log_message(1, 10, 100, 1000, message_id=1)
+    await s.log_messages_bulk([(1, 1, 10, 100, 1000), (2, 1, 10, 100, 1799)])
+    await s.log_message(1, 99, 100, 1000)  # other guild
+    assert await s.get_activity_buckets(1, 10) == [(900, 3, 0)]
+
+    # voice seconds land as sessions close, split on quarter hours
+    await s.open_voice_session(1, 10, 200, 1700)
+    await s.close_voice_session(1, 10, 2000)
+    assert await s.get_activity_buckets(1, 10) == [(900, 3, 100), (1800, 0, 200)]
+    await s.open_voice_session(1, 10, 200, 2700)
+    await s.heartbeat([1], 2800)
+    await s.reconcile_open_sessions(9999)
+    await s.add_voice_sessions_bulk(10, [(1, 300, 4500, 4600)])
+    assert await s.get_activity_buckets(1, 10) == [
+        (900, 3, 100), (1800, 0, 200), (2700, 0, 100), (4500, 0, 100)
+    ]
+    assert await s.last_message_utc(1, 10) == 1799
+
+    # removals keep it in step, and empty buckets disappear
+    await s.delete_voice_sessions_by_source(10, "backlog")
+    await s.purge_legacy_messages(10, 100)
+    assert await s.get_activity_buckets(1, 10) == [(900, 2, 100), (1800, 0, 200), (2700, 0, 100)]
+
+    # a from-scratch rebuild agrees with the incremental result
+    before = await s.get_activity_buckets(1, 10)
+    await s.rebuild_activity_rollup()
+    assert await s.get_activity_buckets(1, 10) == before
+
+    await s.set_optout(1)
+    assert await s.get_activity_buckets(1, 10) == []
+    assert await s.get_activity_buckets(1, 99) == []
+    await s.close()
+
+
+def test_grids_bucketed_in_sqlite(tmp_path):
+    asyncio.run(_sql_grid_flow(str(tmp_path / "grids.db")))
+
+
+async def _sql_grid_flow(db_path: str) -> None:
+    from zoneinfo import ZoneInfo
+
+    from iris import analysis
+
+    s = Storage(db_path, readers=1)
+    await s.open()
+    tz = ZoneInfo("America/New_York")
+    # straddles the 2026-03-08 spring-forward so the offset change matters
+    msgs = [1772900000 + i * 1337 for i in range(300)]
+    sessions = [(1772950000, 1772961000), (1773000000, 1773003600)]
+    await s.log_messages_bulk([(None, 1, 10, 100, ts) for ts in msgs])
+    await s.add_voice_sessions_bulk(10, [(1, 200, a, b) for a, b in sessions])
+
+    assert await s.get_message_grid(1, 10, tz.key) == analysis.message_grid(msgs, tz)
+    since = msgs[150]
+    assert await s.get_message_grid(1, 10, tz.key, since=since) == analysis.message_grid(
+        msgs[150:], tz
+    )
+    assert await s.get_activity_grids(1, 10, tz.key) == analysis.bucket_grids(
+        await s.get_activity_buckets(1, 10), tz
+    )
+    # an unknown zone buckets nothing rather than failing the query
+    assert not any(map(any, await s.get_message_grid(1, 10, "Not/AZone")))
+    await s.close()
+
+
+def test_run_watermark_recovery(tmp_path):
+    asyncio.run(_watermark_flow(str(tmp_path / "runs.db")))
+
+
+async def _watermark_flow(db_path: str) -> None:
+    s = Storage(db_path)
+    await s.open()
+    await s.start_run(1000)
+    await s.open_voice_session(1, 10, 200, 1000)
+    await s.open_game_session(1, 10, "osu!", 1100)
+    await s.open_voice_session(2, 10, 200, 1500)  # joined after the last tick
+    await s.mark_alive(1400)
+    # the tick touched only the runs row; sessions are still open and unstamped
+    assert await s.get_open_sessions() == [(1, 10, 200, 1000), (2, 10, 200, 1500)]
+    await s.db.close()  # crash: nothing closed, nothing flushed
+    s._db = None
+    await s.close()
+
+    s = Storage(db_path)
+    await s.open()
+    assert await s.start_run(2000) != 1
+    assert await s.reconcile_open_sessions(2000) == 2
+    assert await s.reconcile_open_game_sessions(2000) == 1
+    assert await s.get_voice_sessions(1, 10) == [(200, 1000, 1400)]
+    assert await s.get_voice_sessions(2, 10) == [(200, 1500, 1500)]
+    assert await s.get_game_sessions(1, 10) == [("osu!", 1100, 1400)]
+    await s.close()
+
+
+def test_bulk_snapshot_open(tmp_path):
+    asyncio.run(_snapshot_flow(str(tmp_path / "snapshot.db")))
+
+
+async def _snapshot_flow(db_path: str) -> None:
+    s = Storage(db_path)
+    await s.open()
+    await s.start_run(900)
+    assert await s.open_voice_sessions_bulk([], 1000) == {}
+    stale = await s.open_voice_session(1, 10, 200, 950)
+    # snowflake-sized ids survive the JSON batch intact
+    big = 1_234_567_890_123_456_789
+    voice = await s.open_voice_sessions_bulk([(1, 10, 201), (big, 10, 202)], 1000)
+    assert set(voice) == {(10, 1), (10, big)} and stale not in voice.values()
+    assert sorted(await s.get_open_sessions()) == [(1, 10, 201, 1000), (big, 10, 202, 1000)]
+    assert await s.get_voice_sessions(1, 10) == [(200, 950, 950)]
+
+    await s.open_game_session(1, 10, "osu!", 950)
+    games = await s.open_game_sessions_bulk(
+        [(1, 10, "osu!"), (1, 10, "VALORANT"), (2, 10, "osu!")], 1000
+    )
+    assert set(games) == {(10, 1, "osu!"), (10, 1, "VALORANT"), (10, 2, "osu!")}
+    assert len(await s.get_open_game_sessions()) == 3
+    assert await s.get_game_sessions(1, 10) == [("osu!", 950, 950)]
+
+    # returned ids are the live rows, ready for row-id heartbeats
+    await s.heartbeat_voice_rows(voice.values(), 1300)
+    await s.heartbeat_game_rows(games.values(), 1300)
+    await s.reconcile_open_sessions(9999)
+    await s.reconcile_open_game_sessions(9999)
+    assert (202, 1000, 1300) in await s.get_voice_sessions(big, 10)
+    assert ("VALORANT", 1000, 1300) in await s.get_game_sessions(1, 10)
+    await s.close()
+
+
+def test_message_ingest_queue(tmp_path):
+    asyncio.run(_ingest_flow(str(tmp_path / "ingest.db")))
+
+
+async def _ingest_flow(db_path: str) -> None:
+    s = Storage(db_path, ingest_max=4, ingest_batch=3, ingest_interval=0.05)
+    await s.open()
+
+    # queued rows become visible once the background writer commits them
+    await s.queue_message(1, 10, 100, 1000, message_id=501)
+    await asyncio.sleep(0.2)
+    assert [ts for _, ts in await s.get_messages(1, 10)] == [1000]
+
+    # a full queue makes producers wait instead of dropping; explicit flush
+    # writes everything, and duplicate ids are still ignored
+    await asyncio.gather(*(
+        s.queue_message(1, 10, 100, 2000 + i, message_id=600 + i) for i in range(10)
+    ))
+    await s.queue_message(1, 10, 100, 1000, message_id=501)
+    await s.flush_messages()
+    assert len(await s.get_messages(1, 10)) == 11
+    metrics = s.ingest_metrics()
+    assert metrics["depth"] == 0
+    assert metrics["queued"] == metrics["written"] == 12
+    assert metrics["peak_depth"] <= 4 and metrics["waits"] > 0
+
+    # close() flushes whatever is still queued
+    await s.queue_message(2, 10, 100, 3000, message_id=700)
+    await s.close()
+    s = Storage(db_path)
+    await s.open()
+    assert [ts for _, ts in await s.get_messages(2, 10)] == [3000]
+    await s.close()
+
+
 async def _unmute_flow(db_path: str) -> None:
     s = Storage(db_path)
     await s.open()
@@ -84,6 +287,12 @@ async def _game_flow(db_path: str) -> None:
     assert len(open_rows) == 1 and open_rows[0][0] == 2
     assert ("osu!", 3000, 3050) in await s.get_game_sessions(2, 10)
 
+    # row-id heartbeats (the live registry's path) reach the open row only
+    await s.heartbeat_game_rows([await s.open_game_session(3, 10, "osu!", 3000)], 3150)
+    assert await s.reconcile_open_game_sessions(9999) == 2
+    assert ("osu!", 3000, 3150) in await s.get_game_sessions(3, 10)
+    await s.open_game_session(2, 10, "osu!", 3100)
+
     # graceful shutdown closes everything still open at "now"
     await s.close_all_open_game_sessions(3200)
     assert await s.get_open_game_sessions() == []
@@ -160,6 +369,16 @@ async def _flow(db_path: str) -> None:
     assert await s.reconcile_open_sessions(9999) == 1
     assert (200, 6000, 6120) in await s.get_voice_sessions(1, 10)
 
+    # heartbeats by row id touch only that open session
+    first = await s.open_voice_session(1, 10, 200, 6200)
+    other = await s.open_voice_session(1, 99, 200, 6200)
+    await s.heartbeat_voice_rows([first], 6300)
+    await s.close_voice_session(1, 99, 6250)
+    await s.heartbeat_voice_rows([other], 6400)  # closed: no-op
+    assert await s.reconcile_open_sessions(9999) == 1
+    assert (200, 6200, 6300) in await s.get_voice_sessions(1, 10)
+    assert await s.get_voice_sessions(1, 99) == [(200, 6200, 6250)]
+
     # never-heartbeated session reconciles to its start
     await s.open_voice_session(1, 10, 200, 6500)
     await s.reconcile_open_sessions(9999)